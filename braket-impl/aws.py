@@ -1,17 +1,40 @@
 # Imports and Setup
-import matplotlib.pyplot as plt
 import numpy as np
+from collections import Counter
 
 from braket.circuits import Circuit
 from braket.devices import LocalSimulator
 
 from simons_utils import simons_oracle  # noqa: F401
 import argparse
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def simons_circuit(s):
+    """
+    Build the Simon's algorithm circuit for the secret string `s`.
+    Circuits are cached per secret string and must not be modified by callers.
+    """
+    n = len(s)
+
+    circ = Circuit()
+
+    # Apply Hadamard gates to first n qubits
+    circ.h(range(n))
+
+    # Now apply the Oracle for f
+    circ.simons_oracle(s)
+
+    # Apply Hadamard gates to the first n qubits
+    circ.h(range(n))
+
+    return circ
 
 
 
 # Sets the device to run the circuit on
-def simons_algo(s, shots):
+def simons_algo(s, shots, plot=True):
     device = LocalSimulator()
 
 
@@ -28,17 +51,7 @@ def simons_algo(s, shots):
 
     n = len(s)
 
-    circ = Circuit()
-
-    # Apply Hadamard gates to first n qubits
-    circ.h(range(n))
-
-    # Now apply the Oracle for f
-    circ.simons_oracle(s)
-
-    # Apply Hadamard gates to the first n qubits
-    circ.h(range(n))
-
+    circ = simons_circuit(s)
 
     print(circ)
 
@@ -48,28 +61,25 @@ def simons_algo(s, shots):
     result = task.result()
 
     counts = result.measurement_counts
-    plt.bar(counts.keys(), counts.values())
-    plt.xlabel("bit strings")
-    plt.ylabel("counts")
-    plt.xticks(rotation=90)
-    plt.show()
 
-    result = task.result()
+    # Only keep the outcomes on first n qubits, adding up counts of identical truncated bit strings
+    new_results = Counter()
+    for bitstring, count in counts.items():
+        new_results[bitstring[:n]] += count
+
+    if not plot:
+        print(dict(new_results))
+        return
+
+    # Matplotlib is slow to import, so only load it when plotting
+    import matplotlib.pyplot as plt
 
-    counts = result.measurement_counts
     plt.bar(counts.keys(), counts.values())
     plt.xlabel("bit strings")
     plt.ylabel("counts")
     plt.xticks(rotation=90)
     plt.show()
 
-    new_results = {}
-    for bitstring, count in result.measurement_counts.items():
-        # Only keep the outcomes on first n qubits
-        trunc_bitstring = bitstring[:n]
-        # Add the count to that of the of truncated bit string
-        new_results[trunc_bitstring] = new_results.get(trunc_bitstring, 0) + count
-
     plt.bar(new_results.keys(), new_results.values())
     plt.xlabel("bit strings")
     plt.ylabel("counts")
@@ -85,6 +95,7 @@ def main():
     parser = argparse.ArgumentParser(description="Simon's Algorithm with Amazon Braket")
     parser.add_argument("--hidden_string", type=str, required=True, help="The hidden binary string used in Simon's problem (e.g., '11011').")
     parser.add_argument("--shots", type=int, default=12, help="Number of measurement shots for simulation.")
+    parser.add_argument("--no-plot", action="store_true", help="Skip plotting the measurement histograms.")
     args = parser.parse_args()
 
     hidden_string = args.hidden_string
@@ -92,7 +103,7 @@ def main():
 
     # Generate the Simon function circuit
     try:
-        query_circuit = simons_algo(hidden_string, num_measurements)
+        query_circuit = simons_algo(hidden_string, num_measurements, plot=not args.no_plot)
     except ValueError as e:
         print(e)
         return
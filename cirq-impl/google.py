@@ -1,20 +1,41 @@
 import cirq
 import numpy as np
-import matplotlib.pyplot as plt
-from sympy import Matrix
 import random
 import argparse
+import functools
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional; without it the NumPy elimination is always used
+    njit = None
+
+# Below this many columns the JIT dispatch overhead outweighs the compiled loop
+NUMBA_MIN_COLUMNS = 20
+
+# Largest register whose outcomes can be packed into an int64 for vectorized counting
+PACKED_MAX_QUBITS = 63
+
+# Measurement keys for the input and output registers
+INPUT_KEY = 'm_in'
+OUTPUT_KEY = 'm_out'
 
 def generate_secret_string(n):
     """
     Generates a random secret string s of length n with at least one '1'.
     """
-    while True:
-        s = [random.randint(0, 1) for _ in range(n)]
-        if any(s):
-            return s
+    # Draw uniformly from the nonzero n-bit integers and unpack the bits
+    v = random.randrange(1, 1 << n)
+    return [(v >> i) & 1 for i in range(n)]
+
+@functools.lru_cache(maxsize=None)
+def simon_qubits(n):
+    """
+    Returns the qubit registers for Simon's algorithm: n input qubits followed by n output qubits.
+    """
+    return tuple(cirq.LineQubit.range(n)), tuple(cirq.LineQubit.range(n, 2 * n))
 
-def create_simon_oracle(s: list[int]) -> cirq.Circuit:
+def create_simon_oracle(s: list[int]) -> cirq.FrozenCircuit:
     """
     Creates a Cirq circuit implementing the oracle for Simon's algorithm
     with the hidden bitstring s represented as a list of bits.
@@ -23,10 +44,10 @@ def create_simon_oracle(s: list[int]) -> cirq.Circuit:
         s (list[int]): The hidden bitstring for Simon's algorithm (e.g., [1, 0, 1]).
 
     Returns:
-        cirq.Circuit: The quantum oracle circuit.
+        cirq.FrozenCircuit: The quantum oracle circuit, shared between calls with the same s.
     """
     # Validation
-    if not isinstance(s, list):
+    if not isinstance(s, (list, tuple)):
         raise TypeError("Hidden bitstring 's' must be provided as a list of bits (e.g., [1, 0, 1]).")
     if len(s) == 0:
         raise ValueError("Hidden bitstring 's' must contain at least one bit.")
@@ -35,11 +56,18 @@ def create_simon_oracle(s: list[int]) -> cirq.Circuit:
     if all(bit == 0 for bit in s):
         raise ValueError("Hidden bitstring 's' must contain at least one '1'.")
 
+    return _simon_oracle_cached(tuple(s))
+
+@functools.lru_cache(maxsize=None)
+def _simon_oracle_cached(s: tuple[int, ...]) -> cirq.FrozenCircuit:
+    """
+    Builds the oracle for a validated hidden bitstring. Oracles are cached per
+    hidden bitstring, so the circuit is returned frozen.
+    """
     n = len(s)  # Number of qubits
 
     # Define qubits: first n for input x, next n for output y
-    qubits_x = cirq.LineQubit.range(n)
-    qubits_y = cirq.LineQubit.range(n, 2 * n)
+    qubits_x, qubits_y = simon_qubits(n)
 
     # Initialize the circuit
     circuit = cirq.Circuit()
@@ -62,7 +90,7 @@ def create_simon_oracle(s: list[int]) -> cirq.Circuit:
             circuit.append(cirq.CNOT(qubits_x[first_one_index], qubits_y[i]),
                            strategy=cirq.InsertStrategy.NEW)
 
-    return circuit
+    return circuit.freeze()
 
 def simons_algorithm_circuit(n, s):
     """
@@ -76,9 +104,7 @@ def simons_algorithm_circuit(n, s):
     - Cirq Circuit implementing Simon's Algorithm.
     """
     # Define qubits
-    input_qubits = [cirq.LineQubit(i) for i in range(n)]
-    output_qubits = [cirq.LineQubit(i + n) for i in range(n)]
-    qubits = input_qubits + output_qubits
+    input_qubits, output_qubits = simon_qubits(n)
 
     # Create circuit
     circuit = cirq.Circuit()
@@ -93,30 +119,28 @@ def simons_algorithm_circuit(n, s):
 
     # Step 3: Measure output qubits to collapse the state
     # This step is optional but helps in visualization
-    for q in output_qubits:
-        circuit.append(cirq.measure(q, key=f"m_{q}"))
+    circuit.append(cirq.measure(*output_qubits, key=OUTPUT_KEY))
 
     # Step 4: Apply Hadamard gates to input qubits
     for q in input_qubits:
         circuit.append(cirq.H(q))
 
     # Step 5: Measure input qubits
-    for q in input_qubits:
-        circuit.append(cirq.measure(q, key=f"m_{q}"))
+    circuit.append(cirq.measure(*input_qubits, key=INPUT_KEY))
 
     return circuit
 
 def run_simulation(circuit, repetitions=2048, noise_level=0.0):
     """
-    Runs the quantum circuit on a simulator.
+    Runs the quantum circuit(s) on a simulator.
 
     Parameters:
-    - circuit: Cirq Circuit to execute.
-    - repetitions: Number of simulation runs.
+    - circuit: Cirq Circuit to execute, or a list of Circuits to run as one batch.
+    - repetitions: Number of simulation runs per circuit.
     - noise_level: Probability of error for depolarizing noise.
 
     Returns:
-    - Result object from the simulation.
+    - Result object from the simulation, or a list of Results for a list of circuits.
     """
     simulator = cirq.Simulator()
 
@@ -127,62 +151,170 @@ def run_simulation(circuit, repetitions=2048, noise_level=0.0):
         # For simplicity, we'll proceed without noise here
         print("Noise simulation is not directly supported in Cirq's QASM Simulator.")
     
-    result = simulator.run(circuit, repetitions=repetitions)
-    return result
+    # Run everything through a single batched call so setup is amortized across circuits
+    circuits = [circuit] if isinstance(circuit, cirq.AbstractCircuit) else list(circuit)
+    results = [sweep[0] for sweep in simulator.run_batch(circuits, repetitions=repetitions)]
+    return results[0] if isinstance(circuit, cirq.AbstractCircuit) else results
+
+def gf2_eliminate(rows, n, pivot_columns):
+    """
+    Reduces a matrix over GF(2) to reduced row echelon form in place.
+
+    Parameters:
+    - rows: NumPy uint64 array, one matrix row per element with column i in bit i.
+    - n: Number of columns (at most 64).
+    - pivot_columns: NumPy int64 array of length n, filled with the pivot column of each reduced row.
+
+    Returns:
+    - The rank of the matrix.
+    """
+    rank = 0
+    for c in range(n):
+        if rank == len(rows):
+            break
+        bit = np.uint64(1 << c)
+        candidates = np.flatnonzero(rows[rank:] & bit)
+        if candidates.size == 0:
+            continue
+        # Swap the pivot row into place
+        pivot = rank + candidates[0]
+        rows[[rank, pivot]] = rows[[pivot, rank]]
+        # Clear column c from every other row (adding rows is XOR over GF(2))
+        mask = (rows & bit) != 0
+        mask[rank] = False
+        rows ^= np.where(mask, rows[rank], np.uint64(0))
+        pivot_columns[rank] = c
+        rank += 1
+    return rank
+
+def gf2_eliminate_loops(rows, n, pivot_columns):
+    """
+    Same as gf2_eliminate, written as explicit loops so Numba can compile it.
+    """
+    rank = 0
+    for c in range(n):
+        if rank == len(rows):
+            break
+        bit = np.uint64(1) << np.uint64(c)
+        pivot = -1
+        for r in range(rank, len(rows)):
+            if rows[r] & bit:
+                pivot = r
+                break
+        if pivot < 0:
+            continue
+        # Swap the pivot row into place
+        tmp = rows[rank]
+        rows[rank] = rows[pivot]
+        rows[pivot] = tmp
+        # Clear column c from every other row (adding rows is XOR over GF(2))
+        for r in range(len(rows)):
+            if r != rank and rows[r] & bit:
+                rows[r] ^= rows[rank]
+        pivot_columns[rank] = c
+        rank += 1
+    return rank
+
+gf2_eliminate_jit = njit(cache=True)(gf2_eliminate_loops) if njit is not None else None
+
+def gf2_null_vector(rows, n):
+    """
+    Finds a nonzero vector in the nullspace of a matrix over GF(2).
+
+    Parameters:
+    - rows: NumPy uint64 array, one matrix row per element with column i in bit i.
+    - n: Number of columns (at most 64).
+
+    Returns:
+    - The nullspace vector packed into an int, or None if the nullspace is trivial.
+    """
+    if n > 64:
+        raise ValueError(f"Rows are packed into uint64; at most 64 columns are supported, got n={n}.")
+    rows = rows.copy()
+    pivot_columns = np.zeros(n, dtype=np.int64)
+    if gf2_eliminate_jit is not None and n >= NUMBA_MIN_COLUMNS:
+        rank = gf2_eliminate_jit(rows, n, pivot_columns)
+    else:
+        rank = gf2_eliminate(rows, n, pivot_columns)
+    pivot_columns = pivot_columns[:rank].tolist()
+
+    free_columns = [c for c in range(n) if c not in pivot_columns]
+    if not free_columns:
+        return None
+
+    # Set the first free variable to 1 and the others to 0; each pivot variable
+    # then equals the coefficient of that free variable in its reduced row.
+    f = free_columns[0]
+    s = 1 << f
+    for r, c in enumerate(pivot_columns):
+        if (int(rows[r]) >> f) & 1:
+            s |= 1 << c
+    return s
 
 def extract_secret_string(counts, n, s=None):
     """
     Extracts the secret string s from measurement counts.
 
     Parameters:
-    - counts: Measurement counts from the simulation.
+    - counts: Measurement counts from the simulation, keyed by outcome. Outcomes must be
+      bit tuples (e.g. (0, 1, 1)) or bit strings (e.g. '011'); their first n bits are the input qubits.
     - n: Number of input qubits.
     - s: (Optional) The actual secret string for verification.
 
     Returns:
     - Secret string s as a list of bits or None.
     """
-    y_vectors = []
-    for bittuple, count in counts.items():
-        if count == 0:
-            continue
-        # Convert tuple to string
-        bitstring = ''.join(map(str, bittuple))
-        # Extract input qubits' measurements
-        y = [int(bit) for bit in bitstring[:n]]
-        # Exclude all-zero vector
-        if any(y):
-            y_vectors.append(y)
-        if len(y_vectors) >= n-1:
-            break
+    if n > 64:
+        raise ValueError(f"y-vectors are packed into 64-bit rows; at most 64 input qubits are supported, got n={n}.")
+    if not counts:
+        print("Insufficient unique measurements (0) to determine s.")
+        return None
+
+    # Stack all measured outcomes into one array and keep the input qubits' bits
+    outcomes = list(counts.keys())
+    if isinstance(outcomes[0], str):
+        keys = np.frombuffer(''.join(outcomes).encode('ascii'), dtype=np.uint8) - np.uint8(ord('0'))
+    else:
+        keys = np.asarray(outcomes, dtype=np.uint8)
+    keys = keys.reshape(len(outcomes), -1)
+    if (keys > 1).any():
+        raise ValueError("Measurement outcomes must be bit tuples or bit strings containing only 0/1.")
+    vals = np.asarray(list(counts.values()))
+    y = keys[vals > 0, :n]
+    # Exclude all-zero vectors and duplicates. All remaining vectors go to the
+    # solver, since the first n-1 unique ones are not necessarily independent.
+    y = y[y.any(axis=1)]
+    y_vectors = np.unique(y, axis=0)
 
     if len(y_vectors) < n-1:
         print(f"Insufficient unique measurements ({len(y_vectors)}) to determine s.")
         return None
 
-    # Optional: Print collected y-vectors for verification
-    print("\nCollected y-vectors:")
-    for y in y_vectors:
-        y_str = ''.join(map(str, y))
-        if s:
-            # Verify y • s = 0
-            dot_product = sum([y[i]*s[i] for i in range(n)]) % 2
-            print(f"y = {y_str}, y • s = {dot_product}")
-        else:
-            print(f"y = {y_str}")
+    # Optional: Print the first n-1 collected y-vectors for verification
+    shown = y_vectors[:n-1]
+    print(f"\nCollected {len(y_vectors)} unique y-vectors, showing {len(shown)}:")
+    if s:
+        # Verify y • s = 0 for every collected vector at once
+        dot_products = (y_vectors @ np.asarray(s)) % 2
+        for y, dot_product in zip(shown, dot_products):
+            print(f"y = {''.join(map(str, y))}, y • s = {dot_product}")
+        print(f"Vectors with y • s != 0: {np.count_nonzero(dot_products)}")
+    else:
+        for y in shown:
+            print(f"y = {''.join(map(str, y))}")
 
-    # Convert to SymPy Matrix
-    A = Matrix(y_vectors)
+    # Pack each y-vector into a single uint64 (bit i holds y[i])
+    rows = np.bitwise_or.reduce(y_vectors.astype(np.uint64) << np.arange(n, dtype=np.uint64), axis=1)
 
-    # Perform row reduction to find the nullspace
-    nullspace = A.nullspace()
+    # Perform row reduction over GF(2) to find the nullspace
+    s_packed = gf2_null_vector(rows, n)
 
-    if not nullspace:
+    if s_packed is None:
         print("No solution found. The oracle might not be correctly implemented.")
         return None
 
-    # Extract the secret string from the nullspace
-    s_extracted = [int(bit) % 2 for bit in nullspace[0]]
+    # Unpack the secret string from the nullspace vector
+    s_extracted = [(s_packed >> i) & 1 for i in range(n)]
     return s_extracted
 
 def display_circuit(circuit: cirq.Circuit):
@@ -198,7 +330,7 @@ def display_circuit(circuit: cirq.Circuit):
         # Fallback to text diagram if SVG is not available
         print(cirq.Circuit.to_text_diagram(circuit))
 
-def plot_histogram_custom(result, n, title="Measurement Results"):
+def plot_histogram_custom(result, n, title="Measurement Results", key=INPUT_KEY):
     """
     Plots a histogram of measurement results for Cirq.
 
@@ -206,18 +338,24 @@ def plot_histogram_custom(result, n, title="Measurement Results"):
     - result: Cirq Result object from the simulation.
     - n: Number of input qubits.
     - title: Title of the histogram.
+    - key: Measurement key of the input register.
     """
     import collections
-
-    # Extract measurement keys for input qubits
-    keys = [f"m_{cirq.LineQubit(i)}" for i in range(n)]
-    measurements = [result.measurements[key].flatten() for key in keys]
-
-    # Combine measurements into bitstrings
-    bitstrings = [''.join(str(bit) for bit in row) for row in zip(*measurements)]
-
-    # Count occurrences
-    counts = collections.Counter(bitstrings)
+    # Matplotlib is slow to import, so only load it when plotting
+    import matplotlib.pyplot as plt
+
+    # Input qubit measurements, one row of n bits per repetition
+    measurements = result.measurements[key]
+
+    if n <= PACKED_MAX_QUBITS:
+        # Pack each row into an integer (first qubit as most significant bit) and count
+        # only the observed outcomes, so memory stays O(shots) rather than O(2^n)
+        ints = measurements.astype(np.int64) @ (1 << np.arange(n - 1, -1, -1, dtype=np.int64))
+        outcomes, outcome_counts = np.unique(ints, return_counts=True)
+        counts = {format(i, f'0{n}b'): c for i, c in zip(outcomes, outcome_counts)}
+    else:
+        # Outcomes do not fit in an int64; count bitstrings directly
+        counts = collections.Counter(''.join(map(str, row)) for row in measurements)
 
     # Plot histogram
     plt.figure(figsize=(10, 6))
@@ -227,14 +365,20 @@ def plot_histogram_custom(result, n, title="Measurement Results"):
     plt.title(title)
     plt.show()
 
-def test_simon(n, shots=8192, s=None):
+def test_simon(n, shots=8192, s=None, plot=True):
     """
     Tests Simon's Algorithm with n qubits.
 
     Parameters:
     - n: Number of input qubits.
     - shots: Number of simulation runs.
+    - s: (Optional) The secret string as a list of bits; random if not given.
+    - plot: Whether to plot the measurement histogram.
     """
+    # Collect enough samples in one run to find n-1 independent y-vectors
+    # instead of re-running the circuit when s cannot be determined
+    shots = max(shots, 4 * n)
+
     if s is None:
         s = generate_secret_string(n)
     else:
@@ -254,13 +398,12 @@ def test_simon(n, shots=8192, s=None):
     print(result)
 
     # Plot histogram
-    plot_histogram_custom(result, n, "Simon's Algorithm Measurement Results")
+    if plot:
+        plot_histogram_custom(result, n, "Simon's Algorithm Measurement Results", key=INPUT_KEY)
 
     # Extract secret string
-    counts = result.multi_measurement_histogram(keys=[f"m_{cirq.LineQubit(i)}" for i in range(n)])
-    # Convert tuple keys to strings
-    counts_str = { ''.join(str(bit) for bit in key): value for key, value in counts.items() }
-    extracted_s = extract_secret_string(counts_str, n, s)
+    counts = result.histogram(key=INPUT_KEY, fold_func=tuple)
+    extracted_s = extract_secret_string(counts, n, s)
     print(f"\nExtracted Secret String s: {''.join(map(str, extracted_s)) if extracted_s else 'None'}")
 
     # Verify correctness
@@ -274,6 +417,7 @@ def main():
     parser.add_argument("--n", type=int, default=5, help="Number of input qubits.")
     parser.add_argument("--hidden_string", type=str, default=None, help="The secret bitstring (e.g., '101'). If not provided, a random one is generated.")
     parser.add_argument("--shots", type=int, default=8192, help="Number of simulation shots.")
+    parser.add_argument("--no-plot", action="store_true", help="Skip plotting the measurement histogram.")
     args = parser.parse_args()
 
     n = args.n
@@ -285,7 +429,7 @@ def main():
         s_str = args.hidden_string.strip()
         s = [int(bit) for bit in s_str]
 
-    test_simon(n=n, shots=shots, s=s)
+    test_simon(n=n, shots=shots, s=s, plot=not args.no_plot)
 
 if __name__ == "__main__":
     main()
@@ -1,43 +1,72 @@
-import numpy as np
 import argparse
-from qiskit import QuantumCircuit
+import random
+from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator
 from qiskit.visualization import circuit_drawer
 
+# Gates the stabilizer simulator can run (plus non-unitary instructions)
+CLIFFORD_GATES = {'id', 'x', 'y', 'z', 'h', 's', 'sdg', 'sx', 'sxdg', 'cx', 'cy', 'cz', 'swap',
+                  'measure', 'barrier'}
+
+# Simulators are created once and reused across calls
+_STABILIZER_SIM = AerSimulator(method='stabilizer')
+_STATEVECTOR_SIM = AerSimulator(method='statevector')
+
+
+def is_clifford(qc: QuantumCircuit):
+    """
+    Check whether every instruction in `qc` is a Clifford gate (or a measurement/barrier).
+    """
+    return all(instruction.operation.name in CLIFFORD_GATES for instruction in qc.data)
+
 
 def simon_function(s: str):
     """
     Create a QuantumCircuit implementing a query gate for Simon problem obeying the promise for the hidden string `s`
     """
+    if any(b not in '01' for b in s):
+        raise ValueError(f"Hidden string must be a binary string, got '{s}'.")
+
     n = len(s)
     qc = QuantumCircuit(2 * n)
 
-    # Define a random permutation of all n-bit strings. This will effectively hide the string s.
-    pi = np.random.permutation(2**n)
-
-    # Define a query gate that satisfies Simon's promise
-    query_gate = np.zeros((2**(2 * n), 2**(2 * n)), dtype=complex)
-    for x in range(2**n):
-        for y in range(2**n):
-            z = y ^ pi[min(x, x ^ int(s, 2))]
-            query_gate[x + 2**n * z, x + 2**n * y] = 1
-
-    # Check if the matrix is unitary
-    if not np.allclose(query_gate @ query_gate.conj().T, np.eye(2**(2 * n))):
-        raise ValueError("Matrix is not unitary. Something went wrong.")
-
-    # Add the unitary to the circuit
-    qc.unitary(query_gate, range(2 * n))
+    # Random relabelling of the output qubits and random output mask, both indexed by qubit:
+    # out[q] is the output qubit fed by input qubit q, and bit q of mask flips output qubit n + q.
+    # This only randomizes the gate layout and the output values at O(n) cost. f stays linear,
+    # so unlike a random permutation of all n-bit strings it does not hide s: the flag qubit's
+    # CNOT targets, mapped back through out, spell it out.
+    out = [n + q for q in random.sample(range(n), n)]
+    mask = random.getrandbits(n)
+
+    # Copy the input register onto the relabelled output register: |x>|0> -> |x>|P(x)>
+    for q in range(n):
+        qc.cx(q, out[q])
+
+    # XOR s onto the output whenever the first '1' bit of s is set in x, so that f(x) = f(x ^ s).
+    # As with int(s, 2), the leftmost character of s is the most significant bit, i.e. qubit n-1.
+    j = n - 1 - s.find('1')
+    for i, b in enumerate(s):
+        if b == '1':
+            qc.cx(j, out[n - 1 - i])
+
+    # Flip the masked output bits: f(x) -> f(x) ^ mask keeps f 2-to-1 with the same period
+    for q in range(n):
+        if (mask >> q) & 1:
+            qc.x(n + q)
 
     # Return the circuit
     return qc
 
 
-def simon_measurements(problem: QuantumCircuit, k: int):
+def simon_measurements(problem: QuantumCircuit, k: int, batches: int = 1):
     """
     Quantum part of Simon's algorithm. Given a `QuantumCircuit` that
     implements f, get `k` measurements to be post-processed later.
+    With `batches` > 1, `batches * k` measurements are gathered in a single simulator run.
     """
+    if batches < 1:
+        raise ValueError(f"batches must be at least 1, got {batches}.")
+
     n = problem.num_qubits // 2
 
     qc = QuantumCircuit(2 * n, n)
@@ -46,9 +75,12 @@ def simon_measurements(problem: QuantumCircuit, k: int):
     qc.h(range(n))
     qc.measure(range(n), range(n))
 
-    # Simulate the circuit
-    result = AerSimulator().run(qc, shots=k, memory=True).result()
-    return result.get_memory()
+    # Simulate the circuit, using the polynomial-time stabilizer method for Clifford circuits
+    sim = _STABILIZER_SIM if is_clifford(qc) else _STATEVECTOR_SIM
+    # Transpile once and reuse the result for every batch
+    tqc = transpile(qc, sim, optimization_level=0)
+    result = sim.run([tqc] * batches, shots=k, memory=True).result()
+    return [m for i in range(batches) for m in result.get_memory(i)]
 
 
 def main():
@@ -58,6 +90,7 @@ def main():
     parser = argparse.ArgumentParser(description="Simon's Algorithm with Qiskit")
     parser.add_argument("--hidden_string", type=str, required=True, help="The hidden binary string used in Simon's problem (e.g., '11011').")
     parser.add_argument("--shots", type=int, default=1024, help="Number of measurement shots for simulation.")
+    parser.add_argument("--batches", type=int, default=1, help="Number of batches of shots to run in a single simulator call.")
     args = parser.parse_args()
 
     hidden_string = args.hidden_string
@@ -74,7 +107,7 @@ def main():
     print(query_circuit.draw())
 
     # Perform measurements
-    measurements = simon_measurements(query_circuit, num_measurements)
+    measurements = simon_measurements(query_circuit, num_measurements, args.batches)
     print("\nMeasurement Results:")
     print(measurements)
 